@@ -15,14 +15,14 @@ fi
 cp /home/docker/github-backup/config/config.json /home/docker/github-backup/config.json
 
 # Update token in config.json match $TOKEN environment variable
-sed -i '/token/c\    \"token\" : \"'${TOKEN}'\",' /home/docker/github-backup/config.json
+sed -i '/"token"/c\    \"token\" : \"'${TOKEN}'\",' /home/docker/github-backup/config.json
 
 # Return config.json to persistant volume
 cp /home/docker/github-backup/config.json /home/docker/github-backup/config/config.json
 
 # Start backup
 while true; do
-    python3 ./github-backup/github-backup.py /home/docker/github-backup/config/config.json
+    github-backup /home/docker/github-backup/config/config.json
     chown -R 99:100 /home/docker/backups
     sleep $SCHEDULE
 done
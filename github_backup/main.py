@@ -0,0 +1,364 @@
+import argparse
+import base64
+import configparser
+import errno
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack, suppress
+from email.utils import parsedate_to_datetime
+
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+NAME_RE = re.compile(r"^\w[-.\w]*\Z")
+
+LOGIN_CACHE_TTL = 24 * 60 * 60  # Seconds
+
+MAX_ATTEMPTS = 5
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+
+REPOSITORIES_QUERY = """
+query($after: String) {
+  viewer {
+    repositories(
+      first: 100
+      affiliations: [OWNER, COLLABORATOR, ORGANIZATION_MEMBER]
+      ownerAffiliations: [OWNER, COLLABORATOR, ORGANIZATION_MEMBER]
+      after: $after
+    ) {
+      pageInfo { hasNextPage endCursor }
+      nodes { name owner { login } url }
+    }
+  }
+}
+"""
+
+
+def wait_for_rate_limit_reset(response: requests.Response) -> None:
+    if "X-RateLimit-Reset" in response.headers:
+        reset_time = int(response.headers["X-RateLimit-Reset"])
+        wait_seconds = reset_time - int(time.time()) + 10  # Adding a buffer
+    else:
+        wait_seconds = 60
+    print(f"Rate limit exceeded. Waiting for {wait_seconds} seconds.", file=sys.stderr)
+    time.sleep(wait_seconds)
+
+
+def parse_retry_after(value: str) -> int:
+    # Retry-After holds either a number of seconds or an HTTP date
+    try:
+        return max(int(value), 0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 60
+    return max(int(retry_at.timestamp() - time.time()), 0)
+
+
+def should_retry(e: requests.exceptions.HTTPError, attempts: int) -> bool:
+    status_code = e.response.status_code
+    if 400 <= status_code < 500 and status_code not in (403, 429):
+        print(f"Client error: {e}", file=sys.stderr)
+        return False
+    elif attempts >= MAX_ATTEMPTS:
+        print(f"Giving up after {attempts} attempts: {e}", file=sys.stderr)
+        return False
+    elif status_code in (403, 429) and "Retry-After" in e.response.headers:
+        wait_seconds = parse_retry_after(e.response.headers["Retry-After"])
+        print(f"Secondary rate limit exceeded. Waiting for {wait_seconds} seconds.", file=sys.stderr)
+        time.sleep(wait_seconds)
+        return True
+    elif (
+        status_code == 403
+        and "X-RateLimit-Remaining" in e.response.headers
+        and e.response.headers["X-RateLimit-Remaining"] == "0"
+    ):
+        wait_for_rate_limit_reset(e.response)
+        return True
+    elif status_code == 429:
+        print(f"Too many requests. Waiting for 60 seconds: {e}", file=sys.stderr)
+        time.sleep(60)
+        return True
+    elif status_code == 403:
+        print(f"Client error: {e}", file=sys.stderr)
+        return False
+    else:
+        print(f"Server error: {e}", file=sys.stderr)
+        time.sleep(5)  # Wait a bit before retrying
+        return True
+
+
+def load_cache(cache_path: str) -> dict[str, dict]:
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache_path: str, cache: dict[str, dict]) -> None:
+    with open(cache_path, "w") as f:
+        json.dump(cache, f)
+
+
+def get_json(url: str, session: requests.Session) -> Iterator[dict]:
+    attempts = 0
+    while True:
+        try:
+            response = session.get(url, timeout=10)
+            response.raise_for_status()
+            attempts = 0
+
+            yield orjson.loads(response.content)
+
+            if "next" not in response.links:
+                break
+            url = response.links["next"]["url"]
+
+        except requests.exceptions.HTTPError as e:
+            attempts += 1
+            if should_retry(e, attempts):
+                continue
+            break
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+            print(f"Error fetching data from {url}: {e}", file=sys.stderr)
+            break
+
+
+def get_repositories(session: requests.Session) -> Iterator[list[dict]]:
+    after: str | None = None
+    attempts = 0
+    while True:
+        try:
+            response = session.post(
+                GRAPHQL_URL,
+                json={"query": REPOSITORIES_QUERY, "variables": {"after": after}},
+                timeout=10,
+            )
+            response.raise_for_status()
+            attempts = 0
+
+            data = orjson.loads(response.content)
+            if "errors" in data:
+                # GraphQL reports an exhausted rate limit with a 200 response
+                if any(error.get("type") == "RATE_LIMITED" for error in data["errors"]):
+                    wait_for_rate_limit_reset(response)
+                    continue
+                # Other errors, such as SSO-protected organizations, still come with the rest of the data
+                print(f"GraphQL error: {data['errors']}", file=sys.stderr)
+
+            repositories = ((data.get("data") or {}).get("viewer") or {}).get("repositories")
+            if repositories is None:
+                break
+            yield [node for node in repositories["nodes"] if node is not None]
+
+            if not repositories["pageInfo"]["hasNextPage"]:
+                break
+            after = repositories["pageInfo"]["endCursor"]
+
+        except requests.exceptions.HTTPError as e:
+            attempts += 1
+            if should_retry(e, attempts):
+                continue
+            break
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+            print(f"Error fetching data from {GRAPHQL_URL}: {e}", file=sys.stderr)
+            break
+
+
+def check_name(name: str) -> str:
+    if not NAME_RE.match(name):
+        raise ValueError(f"Invalid name '{name}'")
+    return name
+
+
+def mkdir(path: str) -> bool:
+    try:
+        os.makedirs(path, mode=0o770)
+        return True
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+        return False
+
+
+def git_auth_env(username: str, token: str) -> dict[str, str]:
+    # Passed through the environment so the token stays out of remote URLs and the process list
+    credentials = base64.b64encode(f"{username}:{token}".encode()).decode()
+    return {
+        **os.environ,
+        "GIT_TERMINAL_PROMPT": "0",
+        "GIT_CONFIG_COUNT": "1",
+        "GIT_CONFIG_KEY_0": "http.extraHeader",
+        "GIT_CONFIG_VALUE_0": f"Authorization: Basic {credentials}",
+    }
+
+
+def init_bare_repo(repo_path: str) -> None:
+    subprocess.run(["git", "init", "--bare", "--quiet"], cwd=repo_path, check=True)
+
+
+def clone_partial_repo(repo_path: str, repo_url: str, env: dict[str, str], filter_spec: str) -> None:
+    # Cloning registers the source as the "origin" promisor remote, so omitted objects can be fetched on demand
+    subprocess.run(
+        ["git", "clone", "--bare", "--quiet", f"--filter={filter_spec}", repo_url, repo_path],
+        check=True,
+        env=env,
+    )
+
+
+def is_partial_clone(repo_path: str) -> bool:
+    # Read the config file directly rather than spawning git once more per repository
+    config = configparser.ConfigParser(strict=False, allow_no_value=True, interpolation=None)
+    try:
+        config.read(os.path.join(repo_path, "config"))
+    except configparser.Error:
+        return False
+    return config.has_option('remote "origin"', "promisor")
+
+
+def fetch_repo(repo_path: str, remote: str, env: dict[str, str], filter_spec: str | None = None) -> None:
+    filter_args = [f"--filter={filter_spec}"] if filter_spec else []
+    subprocess.run(
+        [
+            "git",
+            "fetch",
+            "--force",
+            "--prune",
+            "--tags",
+            *filter_args,
+            remote,
+            "refs/heads/*:refs/heads/*",
+        ],
+        cwd=repo_path,
+        check=True,
+        env=env,
+    )
+
+
+def mirror(
+    repo_name: str, repo_url: str, to_path: str, env: dict[str, str], filter_spec: str | None = None
+) -> tuple[str, str]:
+    repo_path = os.path.join(to_path, repo_name)
+    if not os.path.isfile(os.path.join(repo_path, "HEAD")):
+        if filter_spec:
+            clone_partial_repo(repo_path, repo_url, env, filter_spec)
+        else:
+            os.makedirs(repo_path, exist_ok=True)
+            init_bare_repo(repo_path)
+            fetch_repo(repo_path, repo_url, env)
+    elif filter_spec and is_partial_clone(repo_path):
+        fetch_repo(repo_path, "origin", env, filter_spec)
+    else:
+        # Filtering a complete mirror would leave it with missing objects and no remote to recover them from
+        fetch_repo(repo_path, repo_url, env)
+
+    return repo_name, repo_url.split("/")[-2]
+
+
+def create_session(
+    retries: int = 6, backoff_factor: float = 1.0, backoff_jitter: float = 0.5, pool_size: int = 32
+) -> requests.Session:
+    session = requests.Session()
+    session.headers.update({"Accept": "application/vnd.github+json", "X-GitHub-Api-Version": "2022-11-28"})
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        backoff_jitter=backoff_jitter,
+        status_forcelist=[429, 500, 502, 503, 504],
+        # GraphQL queries are sent as POST but are safe to repeat
+        allowed_methods=frozenset(["GET", "POST"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size, pool_block=False)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backup GitHub repositories")
+    parser.add_argument("config", metavar="CONFIG", help="a configuration file")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+
+    owners: list[str] | None = config.get("owners")
+    token: str = config["token"]
+    workers: int = config.get("workers", 8)
+    filter_spec: str | None = config.get("filter")
+    path: str = os.path.expanduser(config["directory"])
+    if mkdir(path):
+        print(f"Created directory {path}", file=sys.stderr)
+
+    # Earlier versions kept the full /user response here
+    with suppress(FileNotFoundError):
+        os.remove(os.path.join(path, "etag_cache.json"))
+
+    login_cache_path: str = os.path.join(path, "login_cache.json")
+    login_cache = load_cache(login_cache_path)
+
+    futures: dict[Future[tuple[str, str]], str] = {}
+    failed = 0
+    seen_owners: set[str] = set()
+    with ExitStack() as stack:
+        session = stack.enter_context(create_session())
+        session.headers.update({"Authorization": f"token {token}"})
+
+        token_hash = hashlib.sha256(token.encode()).hexdigest()
+        cached_login = login_cache.get(token_hash)
+        if cached_login and time.time() - cached_login["time"] < LOGIN_CACHE_TTL:
+            login: str = cached_login["login"]
+        else:
+            user: dict = next(get_json("https://api.github.com/user", session))
+            login = user["login"]
+            login_cache[token_hash] = {"login": login, "time": time.time()}
+            save_cache(login_cache_path, login_cache)
+
+        # Mirrors start while later pages are still being fetched
+        env = git_auth_env(login, token)
+        executor = stack.enter_context(ThreadPoolExecutor(max_workers=workers))
+        for page in get_repositories(session):
+            for repo in page:
+                name: str = check_name(repo["name"])
+                owner: str = check_name(repo["owner"]["login"])
+                clone_url: str = f"{repo['url']}.git"
+
+                if owners and owner not in owners:
+                    continue
+
+                owner_path: str = os.path.join(path, owner)
+                if owner not in seen_owners:
+                    os.makedirs(owner_path, exist_ok=True)
+                    seen_owners.add(owner)
+                future = executor.submit(mirror, name, clone_url, owner_path, env, filter_spec)
+                futures[future] = os.path.join(owner_path, name)
+
+        for future, repo_path in futures.items():
+            try:
+                future.result()
+            except (subprocess.CalledProcessError, OSError) as e:
+                print(f"Failed to mirror {repo_path}: {e}", file=sys.stderr)
+                failed += 1
+
+    if failed:
+        print(f"{failed} of {len(futures)} repositories failed to mirror", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()